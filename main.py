@@ -48,15 +48,28 @@ logger = logging.getLogger(__name__)
 logger.setLevel(logging.WARNING)
 
 
-def get_com_backoff(url, headers, params=None, backoff=0.5):
-    resposta = requests.get(url, headers=headers, params=params)
-    while resposta.status_code == 429:
+def get_com_backoff(url, headers, params=None, backoff=0.5, governador=None):
+    if governador is None:
+        governador = governador_da_camara
+
+    while True:
+        with span(f"aguardando {governador.nome}", "governador"):
+            inicio = governador.adquirir()
+        try:
+            with span(f"GET {url}", "http", params=params):
+                resposta = requests.get(url, headers=headers, params=params)
+        except Exception:
+            governador.liberar(inicio)
+            raise
+
+        if resposta.status_code != 429:
+            governador.liberar(inicio)
+            return resposta
+
+        governador.liberar(inicio, limitado=True)
         logger.warning(f"rate limit atingido (429), esperando {backoff} segundos...")
         time.sleep(backoff)
         backoff *= 2
-        resposta = requests.get(url, headers=headers, params=params)
-
-    return resposta
 
 
 def caminho_absoluto(arquivo):
@@ -128,7 +141,19 @@ import pendulum
 import json
 import tabulate
 import re
-
+import sqlite3
+
+import contextlib
+import cProfile
+import glob
+import gzip
+import hashlib
+import threading
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import prawcore
 import requests
 import requests_cache
 
@@ -138,12 +163,23 @@ CRON_HELP = """Rodar cron que posta atualizações."""
 DELETAR_HELP = (
     """Deleta as postagens das atualizações de um dia ou intervalo de dias."""
 )
+FEED_HELP = """Imprime, uma por linha em JSON, as atualizações registradas no
+            feed de mudanças a partir da posição informada em --desde. O feed
+            é alimentado pelo cron com as atualizações novas de cada dia."""
+SERVIR_HELP = """Serve as atualizações dos dias informados numa API HTTP/JSON
+            local, recarregando-as periodicamente em segundo plano."""
+RECONCILIAR_HELP = """Compara as atualizações da Câmara com os posts do Reddit
+            e imprime um relatório em JSON com posts faltando, órfãos,
+            duplicados e divergências de flair, autor ou ementa."""
 COMANDO_HELP = f"""Comando a ser executado.
 
 cron: {CRON_HELP}
 deletar: {DELETAR_HELP}
 postar: {POSTAR_HELP}
-listar: {LISTAR_HELP}"""
+listar: {LISTAR_HELP}
+reconciliar: {RECONCILIAR_HELP}
+servir: {SERVIR_HELP}
+feed: {FEED_HELP}"""
 DIAS_HELP = """Dias, no format YYYY-MM-DD ou YYYY-MM-DD:YYYY-MM-DD, para listar
             atualizações. Se informado só uma data, lista atualizações de hoje
             até aquele dia (incluso). Se informado um intervalo, lista
@@ -155,6 +191,29 @@ FONTES_HELP = """Fontes de onde baixar os dados. Se nada for informado, baixa
             dados de todas as fontes."""
 SOMENTE_FLAGGED_HELP = """Se informado, lista apenas atualizações que foram
             marcadas com flags."""
+VALIDADE_DO_SNAPSHOT_HELP = """Por quantos minutos reaproveitar o snapshot local
+            das atualizações baixadas por um comando anterior com os mesmos
+            dias e fontes. Ao reaproveitar, só são baixados do Reddit os posts
+            feitos depois do snapshot; da Câmara, que só filtra por dia, são
+            baixados de novo os dias desde o snapshot. Use 0 para sempre baixar
+            tudo de novo."""
+CORRIGIR_FLAIRS_HELP = """Se informado junto com reconciliar, corrige os flairs
+            divergentes dos posts para o tipo de tramitação da Câmara."""
+PORTA_HELP = """Porta em que o comando servir escuta, em 127.0.0.1."""
+INTERVALO_DE_RECARGA_HELP = """De quantos em quantos minutos o comando servir
+            recarrega as atualizações. Deve ser pelo menos 1."""
+DESDE_HELP = """Posição do feed a partir da qual imprimir atualizações
+            (exclusiva). Consumidores devem guardar a última posição lida."""
+SEGUIR_HELP = """Se informado, continua imprimindo as novas atualizações do
+            feed à medida que são registradas."""
+PROFILE_HELP = """Grava um trace com o tempo de cada tipo, proposição,
+            requisição HTTP e chamada ao Reddit no arquivo informado. O
+            arquivo está no formato Chrome trace e pode ser aberto no
+            chrome://tracing, Perfetto ou speedscope. Não pode ser usado com
+            cron ou servir, que nunca terminam."""
+CPROFILE_HELP = """Grava um dump do cProfile da thread principal no arquivo
+            informado. Pode ser lido com pstats ou snakeviz. Não pode ser usado
+            com cron ou servir, que nunca terminam."""
 
 if get_env("DEVELOPMENT", False):
     requests_cache.install_cache(
@@ -167,19 +226,242 @@ if get_env("DEVELOPMENT", False):
 SUBREDDIT = get_env("SUBREDDIT")
 
 URL_DA_API = "https://dadosabertos.camara.leg.br/api/v2"
+DIRETORIO_DE_SNAPSHOTS = caminho_absoluto("snapshots")
+CAMINHO_DO_FEED = caminho_absoluto("feed.sqlite")
+
+
+class GovernadorDeTaxa(object):
+    """Controla taxa e concorrência das requisições feitas a uma API.
+
+    A taxa é limitada por um token bucket e o número de requisições em voo por
+    um limite ajustado com AIMD: respostas rápidas aumentam taxa e limite
+    aditivamente, um 429 (ou uma resposta lenta) os reduz multiplicativamente.
+    A redução é aplicada no máximo uma vez por janela: respostas de requisições
+    que começaram antes da última redução não reduzem de novo. O governador é
+    compartilhado por todas as threads que falam com a mesma API, de modo que
+    a vazão converge para o máximo que a API tolera.
+    """
+
+    def __init__(
+        self,
+        nome,
+        taxa=5.0,
+        taxa_minima=0.5,
+        taxa_maxima=50.0,
+        concorrencia=4,
+        concorrencia_maxima=16,
+        latencia_alvo=2.0,
+    ):
+        self.nome = nome
+        self.taxa = taxa
+        self.taxa_minima = taxa_minima
+        self.taxa_maxima = taxa_maxima
+        self.concorrencia = float(concorrencia)
+        self.concorrencia_maxima = concorrencia_maxima
+        self.latencia_alvo = latencia_alvo
+
+        self._tokens = 1.0
+        self._ultima_reposicao = time.monotonic()
+        self._em_voo = 0
+        self._ultima_reducao = float("-inf")
+        self._condicao = threading.Condition()
+
+    def _repor_tokens(self):
+        agora = time.monotonic()
+        decorrido = agora - self._ultima_reposicao
+        self._ultima_reposicao = agora
+        # o bucket comporta no máximo um segundo de requisições
+        self._tokens = min(max(self.taxa, 1.0), self._tokens + decorrido * self.taxa)
+
+    def adquirir(self):
+        """Espera por um token e por uma vaga de concorrência.
+
+        Retorna o instante de início da requisição, que deve ser passado para
+        `liberar`.
+        """
+        with self._condicao:
+            while True:
+                self._repor_tokens()
+                if self._em_voo < int(self.concorrencia) and self._tokens >= 1:
+                    self._tokens -= 1
+                    self._em_voo += 1
+                    return time.monotonic()
+
+                if self._tokens < 1:
+                    espera = (1 - self._tokens) / self.taxa
+                else:
+                    # sem vaga, espera alguém liberar
+                    espera = None
+                self._condicao.wait(espera)
+
+    def liberar(self, inicio, limitado=False):
+        """Libera a vaga e ajusta taxa e concorrência pelo resultado."""
+        latencia = time.monotonic() - inicio
+        with self._condicao:
+            self._em_voo -= 1
+
+            congestionado = limitado or latencia > self.latencia_alvo
+            if congestionado and inicio < self._ultima_reducao:
+                # a requisição já estava em voo quando reduzimos pela última
+                # vez, então o congestionamento dela já foi levado em conta
+                logger.debug(
+                    f"{self.nome}: congestionamento da janela anterior, mantendo {self.taxa:.2f} req/s e concorrência {int(self.concorrencia)}"
+                )
+            elif limitado:
+                self.taxa = max(self.taxa_minima, self.taxa / 2)
+                self.concorrencia = max(1.0, self.concorrencia / 2)
+                self._tokens = min(self._tokens, 0.0)
+                self._ultima_reducao = time.monotonic()
+                logger.warning(
+                    f"{self.nome}: 429 recebido, reduzindo para {self.taxa:.2f} req/s e concorrência {int(self.concorrencia)}"
+                )
+            elif congestionado:
+                self.taxa = max(self.taxa_minima, self.taxa * 0.9)
+                self.concorrencia = max(1.0, self.concorrencia * 0.9)
+                self._ultima_reducao = time.monotonic()
+                logger.info(
+                    f"{self.nome}: latência de {latencia:.2f}s, reduzindo para {self.taxa:.2f} req/s e concorrência {int(self.concorrencia)}"
+                )
+            else:
+                # aumenta em ~1 a cada "janela" de requisições completadas
+                self.taxa = min(self.taxa_maxima, self.taxa + 1 / self.taxa)
+                self.concorrencia = min(
+                    self.concorrencia_maxima,
+                    self.concorrencia + 1 / self.concorrencia,
+                )
+                logger.debug(
+                    f"{self.nome}: {self.taxa:.2f} req/s, concorrência {int(self.concorrencia)}, em voo {self._em_voo}"
+                )
+
+            self._condicao.notify_all()
+
+
+governador_da_camara = GovernadorDeTaxa("câmara")
+# começa com a ~1 requisição por segundo que o Reddit documenta para clientes
+# OAuth e se ajusta a partir daí pelos 429s
+governador_do_reddit = GovernadorDeTaxa(
+    "reddit", taxa=1.0, concorrencia=2, concorrencia_maxima=4
+)
+
+
+def chamar_reddit(funcao, *args, backoff=1, **kwargs):
+    """Chama a API do Reddit passando pelo governador de taxa."""
+    while True:
+        with span(f"aguardando {governador_do_reddit.nome}", "governador"):
+            inicio = governador_do_reddit.adquirir()
+        try:
+            with span(getattr(funcao, "__name__", repr(funcao)), "reddit"):
+                resultado = funcao(*args, **kwargs)
+        except prawcore.exceptions.TooManyRequests:
+            governador_do_reddit.liberar(inicio, limitado=True)
+            logger.warning(
+                f"rate limit do reddit atingido (429), esperando {backoff} segundos..."
+            )
+            time.sleep(backoff)
+            backoff *= 2
+            continue
+        except Exception:
+            governador_do_reddit.liberar(inicio)
+            raise
+
+        governador_do_reddit.liberar(inicio)
+        return resultado
+
+
+class Rastreador(object):
+    """Registra spans de tempo aninhados de uma execução.
+
+    Os spans são gravados no formato Chrome trace, que pode ser aberto no
+    chrome://tracing, no Perfetto ou no speedscope.
+    """
+
+    def __init__(self):
+        self._eventos = []
+        self._lock = threading.Lock()
+        self._inicio = time.perf_counter()
+
+    @contextlib.contextmanager
+    def span(self, nome, categoria, **args):
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            fim = time.perf_counter()
+            evento = {
+                "name": nome,
+                "cat": categoria,
+                "ph": "X",
+                "ts": (inicio - self._inicio) * 1e6,
+                "dur": (fim - inicio) * 1e6,
+                "pid": os.getpid(),
+                "tid": threading.get_ident(),
+                "args": {k: str(v) for k, v in args.items()},
+            }
+            with self._lock:
+                self._eventos.append(evento)
+
+    def salvar(self, caminho):
+        with self._lock:
+            eventos = list(self._eventos)
+
+        # nomeia as threads para facilitar a leitura no visualizador
+        for thread in threading.enumerate():
+            eventos.append(
+                {
+                    "name": "thread_name",
+                    "ph": "M",
+                    "pid": os.getpid(),
+                    "tid": thread.ident,
+                    "args": {"name": thread.name},
+                }
+            )
+
+        with open(caminho, "w") as f:
+            json.dump({"traceEvents": eventos, "displayTimeUnit": "ms"}, f)
+        logger.info(f"trace com {len(eventos)} eventos salvo em {caminho}")
+
+
+# só é definido quando o script roda com --profile
+rastreador = None
+
+
+@contextlib.contextmanager
+def span(nome, categoria="geral", **args):
+    if rastreador is None:
+        yield
+        return
+
+    with rastreador.span(nome, categoria, **args):
+        yield
+
+
 with open(caminho_absoluto("tramitacoes-selecionadas.txt")) as f:
     TRAMITACOES_SELECIONADAS = [l.strip() for l in f.readlines() if l.strip()]
 
 
-cliente_do_reddit = praw.Reddit(
-    **{
-        "client_id": get_env("REDDIT_CLIENT_ID"),
-        "client_secret": get_env("REDDIT_CLIENT_SECRET"),
-        "user_agent": get_env("REDDIT_USER_AGENT"),
-        "username": get_env("REDDIT_USERNAME"),
-        "password": get_env("REDDIT_PASSWORD"),
-    }
-)
+def criar_cliente_do_reddit():
+    return praw.Reddit(
+        **{
+            "client_id": get_env("REDDIT_CLIENT_ID"),
+            "client_secret": get_env("REDDIT_CLIENT_SECRET"),
+            "user_agent": get_env("REDDIT_USER_AGENT"),
+            "username": get_env("REDDIT_USERNAME"),
+            "password": get_env("REDDIT_PASSWORD"),
+        }
+    )
+
+
+cliente_do_reddit = criar_cliente_do_reddit()
+
+# O PRAW não é thread-safe, então threads que falam com o Reddit em paralelo
+# usam cada uma seu próprio cliente
+_clientes_por_thread = threading.local()
+
+
+def cliente_do_reddit_da_thread():
+    if not hasattr(_clientes_por_thread, "cliente"):
+        _clientes_por_thread.cliente = criar_cliente_do_reddit()
+    return _clientes_por_thread.cliente
 
 
 class Atualizacao(object):
@@ -326,8 +608,12 @@ def inferir_atualizacao_do_post(post):
     ementa = match.group("ementa")
     tipo_de_tramitacao = post.link_flair_text
 
+    # acessar post.comments já dispara a requisição, por isso a função
+    def baixar_comentarios():
+        return list(post.comments)
+
     datahora_da_atualizacao = None
-    for comment in post.comments:
+    for comment in chamar_reddit(baixar_comentarios):
         if comment.author == get_env("REDDIT_USERNAME"):
             body = comment.body
             match = re.match(
@@ -369,7 +655,23 @@ def inferir_atualizacao_do_post(post):
     return atualizacao
 
 
-def buscar_atualizacoes_postadas_no_reddit(data_inicio, data_fim):
+def iterar_posts_novos(subreddit, tamanho_da_pagina=100):
+    """Itera os posts de /new, passando cada página pelo governador do Reddit"""
+
+    def baixar_pagina(depois):
+        params = {"after": depois} if depois else {}
+        return list(subreddit.new(limit=tamanho_da_pagina, params=params))
+
+    depois = None
+    while True:
+        pagina = chamar_reddit(baixar_pagina, depois)
+        yield from pagina
+        if len(pagina) < tamanho_da_pagina:
+            return
+        depois = pagina[-1].fullname
+
+
+def buscar_atualizacoes_postadas_no_reddit(data_inicio, data_fim, postados_depois=None):
     data_inicio = data_inicio
     data_fim = data_fim
     logger.info(
@@ -378,7 +680,9 @@ def buscar_atualizacoes_postadas_no_reddit(data_inicio, data_fim):
     posts = []
     atualizacoes = []
 
-    for i, post in enumerate(cliente_do_reddit.subreddit(SUBREDDIT).new(limit=None)):
+    for i, post in enumerate(
+        iterar_posts_novos(cliente_do_reddit.subreddit(SUBREDDIT))
+    ):
         logger.debug(
             f"date={pendulum.from_timestamp(post.created_utc)}, data_fim={data_fim}, post {i}: {post.id}, link_to_reddit={post.shortlink}"
         )
@@ -386,7 +690,14 @@ def buscar_atualizacoes_postadas_no_reddit(data_inicio, data_fim):
             f"timestamps: post {post.created_utc}, data_fim {data_fim.timestamp()}"
         )
 
-        atualizacao = inferir_atualizacao_do_post(post)
+        if postados_depois and post.created_utc <= postados_depois.timestamp():
+            logger.info(
+                f"parando de buscar posts, {post.id} é anterior a {postados_depois}"
+            )
+            break
+
+        with span(f"post {post.id}", "reddit"):
+            atualizacao = inferir_atualizacao_do_post(post)
         if not atualizacao:
             logger.info(f"post {post.id}, url={post.url} não é uma atualização")
             continue
@@ -532,17 +843,30 @@ def buscar_atualizacoes_do_tipo(
         tipo, data_inicio, data_fim
     )
 
-    atualizacoes = []
-    for proposicao in proposicoes_com_atualizacao:
+    def buscar_dados_da_proposicao(proposicao):
+        nome = f"{proposicao['siglaTipo']} {proposicao['numero']}/{proposicao['ano']}"
+        logger.info(f"buscando atualizações da proposição {nome}")
 
-        logger.info(
-            f"buscando atualizações da proposição {proposicao['siglaTipo']} {proposicao['numero']}/{proposicao['ano']}"
+        id = proposicao["id"]
+        with span(nome, "proposicao", id=id):
+            ultimas_tramitacoes = buscar_tramitacoes(id, data_inicio, data_fim)
+            autor, partido = baixar_autor_principal_e_seu_partido(id)
+        return ultimas_tramitacoes, autor, partido
+
+    # as requisições de fato em voo são limitadas pelo governador da câmara,
+    # o pool só precisa ter threads o suficiente para a concorrência máxima
+    with ThreadPoolExecutor(
+        max_workers=governador_da_camara.concorrencia_maxima
+    ) as executor:
+        dados_das_proposicoes = list(
+            executor.map(buscar_dados_da_proposicao, proposicoes_com_atualizacao)
         )
 
+    atualizacoes = []
+    for proposicao, (ultimas_tramitacoes, autor, partido) in zip(
+        proposicoes_com_atualizacao, dados_das_proposicoes
+    ):
         id = proposicao["id"]
-        ultimas_tramitacoes = buscar_tramitacoes(id, data_inicio, data_fim)
-        autor, partido = baixar_autor_principal_e_seu_partido(id)
-
         for tramitacao in ultimas_tramitacoes:
             if pula(tramitacao):
                 logger.info(
@@ -587,7 +911,10 @@ def buscar_atualizacoes_na_camara(data_inicio, data_fim):
     tipos = ["PL", "PLV", "MPV", "PLP", "PEC"]
     atualizacoes = []
     for tipo in tipos:
-        atualizacoes.extend(buscar_atualizacoes_do_tipo(tipo, data_inicio, data_fim))
+        with span(tipo, "tipo"):
+            atualizacoes.extend(
+                buscar_atualizacoes_do_tipo(tipo, data_inicio, data_fim)
+            )
 
     return atualizacoes
 
@@ -673,54 +1000,506 @@ def buscar_atualizacoes(data_inicio, data_fim, fontes=None):
     return unificado.values()
 
 
+def atualizacao_para_dict(atualizacao):
+    dados = atualizacao._asdict()
+    for campo in ["datahora_da_atualizacao", "datahora_do_post"]:
+        if dados[campo] is not None:
+            dados[campo] = dados[campo].isoformat()
+    dados["flag_related"] = [
+        atualizacao_para_dict(a) for a in atualizacao.flag_related or []
+    ]
+    return dados
+
+
+def atualizacao_de_dict(dados):
+    dados = dict(dados)
+    for campo in ["datahora_da_atualizacao", "datahora_do_post"]:
+        if dados[campo] is not None:
+            dados[campo] = pendulum.parse(dados[campo])
+    dados["flag_related"] = [atualizacao_de_dict(a) for a in dados["flag_related"]]
+    return Atualizacao(**dados)
+
+
+def caminho_do_snapshot(data_inicio, data_fim, fontes):
+    nome = f'{data_inicio.format("YYYY-MM-DD")}_{data_fim.format("YYYY-MM-DD")}_{"-".join(fontes)}.json.gz'
+    return os.path.join(DIRETORIO_DE_SNAPSHOTS, nome)
+
+
+def carregar_snapshot(caminho):
+    try:
+        with gzip.open(caminho, "rt", encoding="utf-8") as f:
+            snapshot = json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, json.decoder.JSONDecodeError) as e:
+        logger.warning(f"snapshot {caminho} inválido, ignorando: {e}")
+        return None
+
+    snapshot["criado_em"] = pendulum.parse(snapshot["criado_em"])
+    snapshot["atualizado_em"] = pendulum.parse(snapshot["atualizado_em"])
+    snapshot["atualizacoes"] = [
+        atualizacao_de_dict(a) for a in snapshot["atualizacoes"]
+    ]
+    return snapshot
+
+
+def salvar_snapshot(caminho, atualizacoes, criado_em, atualizado_em):
+    os.makedirs(DIRETORIO_DE_SNAPSHOTS, exist_ok=True)
+    snapshot = {
+        "criado_em": criado_em.isoformat(),
+        "atualizado_em": atualizado_em.isoformat(),
+        "atualizacoes": [atualizacao_para_dict(a) for a in atualizacoes],
+    }
+    # grava num arquivo temporário para não deixar um snapshot pela metade
+    temporario = caminho + ".tmp"
+    with gzip.open(temporario, "wt", encoding="utf-8") as f:
+        json.dump(snapshot, f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(temporario, caminho)
+    logger.info(f"snapshot com {len(atualizacoes)} atualizações salvo em {caminho}")
+
+
+def invalidar_snapshots():
+    """Apaga todos os snapshots, que ficam desatualizados ao postar ou deletar"""
+    for caminho in glob.glob(os.path.join(DIRETORIO_DE_SNAPSHOTS, "*.json.gz")):
+        os.remove(caminho)
+
+
+def completar_atualizacao(atualizacao, anterior):
+    """Preenche os campos vazios de `atualizacao` com os de `anterior`.
+
+    Os posts anteriores ao snapshot não são baixados de novo, então uma
+    atualização da Câmara baixada de novo precisa herdar os dados do post.
+    """
+    # um post novo para uma atualização que já tinha post é uma duplicata
+    duplicada = (
+        atualizacao.url_do_post is not None
+        and anterior.url_do_post is not None
+        and atualizacao.url_do_post != anterior.url_do_post
+    )
+
+    for campo in Atualizacao._fields:
+        if getattr(atualizacao, campo) is None:
+            setattr(atualizacao, campo, getattr(anterior, campo))
+    atualizacao.flagged = atualizacao.flagged or anterior.flagged or duplicada
+    atualizacao.flag_related = anterior.flag_related + atualizacao.flag_related
+    if duplicada:
+        logger.error(
+            f"cuidado! {atualizacao.id} tem dois posts: {atualizacao.url_do_post} e {anterior.url_do_post}"
+        )
+        atualizacao.flag_related.append(anterior)
+    return atualizacao
+
+
+def buscar_atualizacoes_com_snapshot(data_inicio, data_fim, fontes=None, validade=60):
+    """Como `buscar_atualizacoes`, mas reaproveita um snapshot local.
+
+    O snapshot é identificado pelo intervalo de dias e pelas fontes. Se ele
+    tiver sido criado há menos de `validade` minutos, ele é completado com os
+    posts de todo o intervalo feitos depois da última vez em que foi
+    completado e, como a API da Câmara só filtra por dia, com as atualizações
+    da Câmara a partir daquele dia.
+    """
+    fontes = sorted(set(fontes or ["reddit", "camara"]))
+    caminho = caminho_do_snapshot(data_inicio, data_fim, fontes)
+    agora = pendulum.now()
+
+    snapshot = carregar_snapshot(caminho)
+    if snapshot is None or agora - snapshot["criado_em"] > pendulum.duration(
+        minutes=validade
+    ):
+        atualizacoes = list(buscar_atualizacoes(data_inicio, data_fim, fontes))
+        salvar_snapshot(caminho, atualizacoes, agora, agora)
+        return atualizacoes
+
+    logger.info(f"reaproveitando snapshot de {snapshot['criado_em']}: {caminho}")
+    unificado = {a.id: a for a in snapshot["atualizacoes"]}
+
+    novas = []
+    if "camara" in fontes:
+        inicio_da_camara = max(data_inicio, snapshot["atualizado_em"].start_of("day"))
+        if inicio_da_camara <= data_fim:
+            logger.info(
+                f"completando snapshot com atualizações da câmara entre {inicio_da_camara} e {data_fim}"
+            )
+            novas += buscar_atualizacoes_na_camara(inicio_da_camara, data_fim)
+
+    if "reddit" in fontes:
+        # o post costuma ser feito depois do dia da atualização, então os posts
+        # novos são buscados em todo o intervalo, não só a partir do snapshot
+        logger.info(
+            f"completando snapshot com posts feitos depois de {snapshot['atualizado_em']}"
+        )
+        novas += buscar_atualizacoes_postadas_no_reddit(
+            data_inicio, data_fim, postados_depois=snapshot["atualizado_em"]
+        )
+
+    # as atualizações da câmara vêm antes, assim um post novo é unido à
+    # atualização da câmara correspondente
+    for atualizacao in novas:
+        if atualizacao.id in unificado:
+            completar_atualizacao(atualizacao, unificado[atualizacao.id])
+        unificado[atualizacao.id] = atualizacao
+
+    atualizacoes = list(unificado.values())
+    salvar_snapshot(caminho, atualizacoes, snapshot["criado_em"], agora)
+    return atualizacoes
+
+
+def abrir_feed():
+    conexao = sqlite3.connect(CAMINHO_DO_FEED)
+    # AUTOINCREMENT garante que uma posição nunca é reutilizada
+    conexao.execute("""CREATE TABLE IF NOT EXISTS feed (
+            posicao INTEGER PRIMARY KEY AUTOINCREMENT,
+            id TEXT NOT NULL UNIQUE,
+            registrada_em TEXT NOT NULL,
+            atualizacao TEXT NOT NULL
+        )""")
+    return conexao
+
+
+def registrar_no_feed(atualizacoes):
+    """Adiciona ao feed de mudanças as atualizações que ainda não estão nele"""
+    registrada_em = pendulum.now().isoformat()
+    with contextlib.closing(abrir_feed()) as conexao, conexao:
+        antes = conexao.total_changes
+        conexao.executemany(
+            "INSERT OR IGNORE INTO feed (id, registrada_em, atualizacao) VALUES (?, ?, ?)",
+            [
+                (
+                    a.id,
+                    registrada_em,
+                    json.dumps(atualizacao_para_dict(a), ensure_ascii=False),
+                )
+                for a in atualizacoes
+            ],
+        )
+        novas = conexao.total_changes - antes
+
+    if novas:
+        logger.info(f"{novas} atualizações novas registradas no feed")
+    return novas
+
+
+def ler_feed(desde=0, limite=1000):
+    """Retorna as entradas do feed com posição maior que `desde`"""
+    with contextlib.closing(abrir_feed()) as conexao:
+        linhas = conexao.execute(
+            "SELECT posicao, registrada_em, atualizacao FROM feed WHERE posicao > ? ORDER BY posicao LIMIT ?",
+            (desde, limite),
+        ).fetchall()
+
+    return [
+        {
+            "posicao": posicao,
+            "registrada_em": registrada_em,
+            "atualizacao": json.loads(atualizacao),
+        }
+        for posicao, registrada_em, atualizacao in linhas
+    ]
+
+
+def imprimir_feed(desde=0, seguir=False):
+    while True:
+        # lê página por página até acabarem as entradas
+        while entradas := ler_feed(desde):
+            for entrada in entradas:
+                print(json.dumps(entrada, ensure_ascii=False), flush=True)
+                desde = entrada["posicao"]
+
+        if not seguir:
+            return
+        time.sleep(1)
+
+
 def listar_atualizacoes(data_inicio, data_fim, fontes=None):
     atualizacoes = buscar_atualizacoes(data_inicio, data_fim, fontes)
 
     imprimir_atualizacoes(atualizacoes)
 
 
-def postar_atualizacao(atualizacao):
-    logger.info(f"postando atualizacao {atualizacao.id}")
-    url = atualizacao.url_da_atualizacao
+def autor_do_post(atualizacao):
     autor = atualizacao.autor
     if atualizacao.partido is not None:
         autor += f" - {atualizacao.partido}"
+    return autor
+
+
+def titulo_do_post(atualizacao):
+    return cortar(
+        f"[{autor_do_post(atualizacao)}] {atualizacao.id}: {atualizacao.ementa}", 300
+    )
+
+
+def ementa_do_post(atualizacao):
+    """Retorna a ementa como ela aparece no título do post, possivelmente cortada"""
+    prefixo = f"[{autor_do_post(atualizacao)}] {atualizacao.id}: "
+    return titulo_do_post(atualizacao)[len(prefixo) :]
+
+
+def flair_do_post(atualizacao):
+    return cortar(atualizacao.tipo_de_tramitacao, 64)
+
+
+def reconciliar_atualizacoes(data_inicio, data_fim):
+    """Compara as atualizações da Câmara com os posts do Reddit.
+
+    Monta um índice por id de cada fonte e calcula, numa passada só, as
+    atualizações sem post, os posts sem atualização, os posts duplicados e
+    as divergências de flair, autor e ementa. Retorna um dicionário
+    serializável em JSON.
+    """
+    da_camara = buscar_atualizacoes_na_camara(data_inicio, data_fim)
+    do_reddit = buscar_atualizacoes_postadas_no_reddit(data_inicio, data_fim)
+
+    def indexar(atualizacoes):
+        indice = {}
+        for atualizacao in atualizacoes:
+            indice.setdefault(atualizacao.id, []).append(atualizacao)
+        return indice
+
+    indice_da_camara = indexar(da_camara)
+    indice_do_reddit = indexar(do_reddit)
+
+    comparacoes = [
+        ("flair", flair_do_post, lambda p: p.tipo_de_tramitacao),
+        ("autor", autor_do_post, autor_do_post),
+        ("ementa", ementa_do_post, lambda p: p.ementa),
+    ]
+
+    faltando = []
+    divergencias = []
+    for id, atualizacoes in indice_da_camara.items():
+        atualizacao = atualizacoes[0]
+        posts = indice_do_reddit.get(id)
+        if not posts:
+            faltando.append(
+                {
+                    "id": id,
+                    "url_da_atualizacao": atualizacao.url_da_atualizacao,
+                    "datahora_da_atualizacao": atualizacao.datahora_da_atualizacao,
+                }
+            )
+            continue
+
+        for post in posts:
+            for campo, esperado, encontrado in comparacoes:
+                valor_esperado = (esperado(atualizacao) or "").strip()
+                valor_encontrado = (encontrado(post) or "").strip()
+                if valor_esperado != valor_encontrado:
+                    divergencias.append(
+                        {
+                            "id": id,
+                            "url_do_post": post.url_do_post,
+                            "campo": campo,
+                            "camara": valor_esperado,
+                            "reddit": valor_encontrado,
+                        }
+                    )
+
+    orfaos = []
+    duplicados = []
+    for id, posts in indice_do_reddit.items():
+        if id not in indice_da_camara:
+            orfaos.extend({"id": id, "url_do_post": p.url_do_post} for p in posts)
+        if len(posts) > 1:
+            duplicados.append(
+                {"id": id, "urls_dos_posts": [p.url_do_post for p in posts]}
+            )
+
+    logger.info(
+        f"reconciliação: {len(faltando)} faltando, {len(orfaos)} órfãos, {len(duplicados)} duplicados, {len(divergencias)} divergências"
+    )
+
+    return {
+        "data_inicio": data_inicio,
+        "data_fim": data_fim,
+        "total_camara": len(da_camara),
+        "total_reddit": len(do_reddit),
+        "faltando": faltando,
+        "orfaos": orfaos,
+        "duplicados": duplicados,
+        "divergencias": divergencias,
+    }
+
+
+def postar_atualizacao(atualizacao):
+    logger.info(f"postando atualizacao {atualizacao.id}")
+    url = atualizacao.url_da_atualizacao
     sequencia = atualizacao.sequencia
     if not sequencia:
         logger.error(f"atualizacao {atualizacao.id} não tem sequencia")
         return
-    title = cortar(f"[{autor}] {atualizacao.id}: {atualizacao.ementa}", 300)
-    flair = atualizacao.tipo_de_tramitacao
-    flair = cortar(flair, 64)
+    title = titulo_do_post(atualizacao)
+    flair = flair_do_post(atualizacao)
     datahora = atualizacao.datahora_da_atualizacao.format("DD/MM/YYYY")
     comment = f"Despacho ({datahora})\n\n{atualizacao.despacho}"
 
     cliente_do_reddit.validate_on_submit = True
     logger.info(f"postando {atualizacao.id}")
-    post = cliente_do_reddit.subreddit(SUBREDDIT).submit(title, url=url)
+    post = chamar_reddit(cliente_do_reddit.subreddit(SUBREDDIT).submit, title, url=url)
     logger.info(f"postado {atualizacao.id}: {post.shortlink}")
-    post.mod.flair(text=flair)
-    post.reply(comment)
+    chamar_reddit(post.mod.flair, text=flair)
+    chamar_reddit(post.reply, comment)
 
     return True
 
 
+def fullname_do_post(url_do_post):
+    """Converte o link de um post (e.g., https://redd.it/abc123) no seu fullname (t3_abc123)"""
+    return f"t3_{praw.models.Submission.id_from_url(url_do_post)}"
+
+
+def resolver_posts(urls_dos_posts, tamanho_do_lote=100):
+    """Resolve os posts em lotes pelo /api/info do Reddit.
+
+    Retorna um dicionário da url de cada post para o post, sem as urls que
+    não foram encontradas.
+    """
+
+    def buscar_lote(fullnames):
+        return list(cliente_do_reddit.info(fullnames=fullnames))
+
+    url_por_fullname = {fullname_do_post(url): url for url in urls_dos_posts}
+    fullnames = list(url_por_fullname)
+
+    posts = {}
+    for i in range(0, len(fullnames), tamanho_do_lote):
+        lote = fullnames[i : i + tamanho_do_lote]
+        for post in chamar_reddit(buscar_lote, lote):
+            posts[url_por_fullname[post.fullname]] = post
+        logger.info(
+            f"resolvidos {min(i + len(lote), len(fullnames))}/{len(fullnames)} posts"
+        )
+
+    return posts
+
+
+def moderar_em_lote(tarefas, descricao):
+    """Executa ações de moderação numa fila concorrente limitada.
+
+    Cada tarefa é uma tupla (id, url_do_post, id_do_post, acao, kwargs), em
+    que `acao` é o nome de um método de `post.mod`, e.g., "remove". Cada
+    thread usa seu próprio cliente do Reddit e as chamadas passam pelo
+    governador do Reddit, que limita quantas ficam em voo. Retorna a lista de
+    falhas.
+    """
+
+    def moderar(id_do_post, acao, kwargs):
+        # o post é criado sem ser baixado, só a ação faz uma requisição
+        post = cliente_do_reddit_da_thread().submission(id=id_do_post)
+        return chamar_reddit(getattr(post.mod, acao), **kwargs)
+
+    falhas = []
+    concluidas = 0
+    with ThreadPoolExecutor(
+        max_workers=governador_do_reddit.concorrencia_maxima
+    ) as executor:
+        futuros = {
+            executor.submit(moderar, id_do_post, acao, kwargs): (id, url_do_post)
+            for id, url_do_post, id_do_post, acao, kwargs in tarefas
+        }
+        for futuro in as_completed(futuros):
+            id, url_do_post = futuros[futuro]
+            concluidas += 1
+            try:
+                futuro.result()
+            except Exception as e:
+                logger.error(f"{descricao} {id} ({url_do_post}) falhou: {e}")
+                falhas.append({"id": id, "url_do_post": url_do_post, "erro": str(e)})
+            logger.info(f"{descricao}: {concluidas}/{len(futuros)}")
+
+    return falhas
+
+
+def imprimir_falhas(falhas, descricao):
+    if not falhas:
+        return
+    logger.error(f"{len(falhas)} falhas ao {descricao}:")
+    for falha in falhas:
+        logger.error(f"{falha['id']} ({falha['url_do_post']}): {falha['erro']}")
+
+
 def deletar_atualizacoes(atualizacoes):
-    count = 0
+    # os snapshots já foram lidos, e vão ficar desatualizados mesmo que a
+    # operação falhe no meio
+    invalidar_snapshots()
+
+    postadas = []
     for atualizacao in atualizacoes:
         if atualizacao.url_do_post is None:
             logger.warning(f"atualizacao {atualizacao.id} não foi postada, pulando")
             continue
-        logger.info(
+        postadas.append(atualizacao)
+
+    posts = resolver_posts([a.url_do_post for a in postadas])
+
+    falhas = []
+    tarefas = []
+    for atualizacao in postadas:
+        post = posts.get(atualizacao.url_do_post)
+        if post is None:
+            falhas.append(
+                {
+                    "id": atualizacao.id,
+                    "url_do_post": atualizacao.url_do_post,
+                    "erro": "post não encontrado",
+                }
+            )
+            continue
+        logger.debug(
             f"deletando atualizacao {atualizacao.id} ({atualizacao.url_do_post})"
         )
-        post = cliente_do_reddit.submission(url=atualizacao.url_do_post)
-        post.mod.remove()
-        count += 1
-    logger.info(f"deletadas {count} atualizacoes")
+        tarefas.append((atualizacao.id, atualizacao.url_do_post, post.id, "remove", {}))
+
+    falhas_da_moderacao = moderar_em_lote(tarefas, "deletando")
+    logger.info(f"deletadas {len(tarefas) - len(falhas_da_moderacao)} atualizacoes")
+    falhas += falhas_da_moderacao
+    imprimir_falhas(falhas, "deletar")
+
+    return falhas
+
+
+def corrigir_flairs(relatorio):
+    """Corrige os flairs divergentes encontrados por `reconciliar_atualizacoes`"""
+    divergencias = [d for d in relatorio["divergencias"] if d["campo"] == "flair"]
+    posts = resolver_posts([d["url_do_post"] for d in divergencias])
+
+    falhas = []
+    tarefas = []
+    for divergencia in divergencias:
+        post = posts.get(divergencia["url_do_post"])
+        if post is None:
+            falhas.append(
+                {
+                    "id": divergencia["id"],
+                    "url_do_post": divergencia["url_do_post"],
+                    "erro": "post não encontrado",
+                }
+            )
+            continue
+        tarefas.append(
+            (
+                divergencia["id"],
+                divergencia["url_do_post"],
+                post.id,
+                "flair",
+                {"text": divergencia["camara"]},
+            )
+        )
+
+    falhas_da_moderacao = moderar_em_lote(tarefas, "corrigindo flair")
+    logger.info(f"corrigidos {len(tarefas) - len(falhas_da_moderacao)} flairs")
+    falhas += falhas_da_moderacao
+    imprimir_falhas(falhas, "corrigir flairs")
+
+    return falhas
 
 
 def postar_atualizacoes(atualizacoes):
+    # os snapshots já foram lidos, e vão ficar desatualizados mesmo que a
+    # operação falhe no meio
+    invalidar_snapshots()
+
     count = 0
     for atualizacao in atualizacoes:
         if atualizacao.flagged:
@@ -738,9 +1517,231 @@ def postar_atualizacoes(atualizacoes):
     logger.info(f"postadas {count} atualizacoes")
 
 
+class CacheDeAtualizacoes(object):
+    """Mantém as atualizações em memória, recarregando-as em segundo plano"""
+
+    def __init__(self, dias, fontes=None, intervalo_de_recarga=15):
+        self.dias = dias
+        self.fontes = fontes
+        self.intervalo_de_recarga = intervalo_de_recarga
+        self.atualizacoes = []
+        self._lock = threading.Lock()
+
+    def recarregar(self):
+        # os dias são recalculados a cada recarga porque podem ser relativos
+        # a hoje
+        data_inicio, data_fim = intervalo_de_dias(self.dias)
+        atualizacoes = list(buscar_atualizacoes(data_inicio, data_fim, self.fontes))
+        with self._lock:
+            self.atualizacoes = atualizacoes
+        logger.info(f"cache recarregado com {len(atualizacoes)} atualizações")
+
+    def recarregar_periodicamente(self):
+        while True:
+            time.sleep(self.intervalo_de_recarga * 60)
+            try:
+                self.recarregar()
+            except Exception:
+                logger.exception("erro ao recarregar cache, mantendo o anterior")
+
+    def filtrar(self, inicio=None, fim=None, tipo=None, partido=None, flagged=None):
+        with self._lock:
+            atualizacoes = self.atualizacoes
+
+        def selecionada(atualizacao):
+            datahora = atualizacao.datahora_da_atualizacao
+            if inicio is not None and (datahora is None or datahora.date() < inicio):
+                return False
+            if fim is not None and (datahora is None or datahora.date() > fim):
+                return False
+            if tipo is not None and atualizacao.tipo not in tipo:
+                return False
+            if partido is not None and atualizacao.partido not in partido:
+                return False
+            if flagged is not None and bool(atualizacao.flagged) != flagged:
+                return False
+            return True
+
+        return sorted(
+            filter(selecionada, atualizacoes),
+            key=lambda a: (
+                a.datahora_da_atualizacao is None,
+                a.datahora_da_atualizacao,
+            ),
+        )
+
+
+def etag_corresponde(if_none_match, etag):
+    """Verifica se o ETag está na lista do cabeçalho If-None-Match"""
+    if if_none_match is None:
+        return False
+
+    for candidato in if_none_match.split(","):
+        candidato = candidato.strip()
+        if candidato == "*":
+            return True
+        # a comparação do If-None-Match é fraca, ignora o prefixo W/
+        if candidato.startswith("W/"):
+            candidato = candidato[2:]
+        if candidato == etag:
+            return True
+    return False
+
+
+def criar_handler(cache):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = urllib.parse.urlparse(self.path)
+            parametros = urllib.parse.parse_qs(url.query)
+
+            if url.path == "/feed":
+                try:
+                    desde = int(parametros.get("desde", ["0"])[0])
+                    limite = int(parametros.get("limite", ["1000"])[0])
+                except ValueError as e:
+                    self.responder(400, {"erro": str(e)})
+                    return
+                self.responder(200, ler_feed(desde, limite))
+                return
+
+            if url.path != "/atualizacoes":
+                self.responder(404, {"erro": f"caminho inválido: {url.path}"})
+                return
+
+            def lista(nome):
+                if nome not in parametros:
+                    return None
+                return [v for valor in parametros[nome] for v in valor.split(",")]
+
+            try:
+                inicio = fim = flagged = None
+                if "inicio" in parametros:
+                    inicio = pendulum.parse(parametros["inicio"][0]).date()
+                if "fim" in parametros:
+                    fim = pendulum.parse(parametros["fim"][0]).date()
+                if "flagged" in parametros:
+                    flagged = parametros["flagged"][0].lower() in ["1", "true", "sim"]
+            except ValueError as e:
+                self.responder(400, {"erro": str(e)})
+                return
+
+            atualizacoes = cache.filtrar(
+                inicio=inicio,
+                fim=fim,
+                tipo=lista("tipo"),
+                partido=lista("partido"),
+                flagged=flagged,
+            )
+            self.responder(200, [atualizacao_para_dict(a) for a in atualizacoes])
+
+        def responder(self, status, dados):
+            corpo = json.dumps(dados, ensure_ascii=False).encode("utf-8")
+            etag = f'"{hashlib.sha1(corpo).hexdigest()}"'
+
+            if status == 200 and etag_corresponde(
+                self.headers.get("If-None-Match"), etag
+            ):
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.end_headers()
+                return
+
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(corpo)))
+            self.send_header("ETag", etag)
+            self.end_headers()
+            self.wfile.write(corpo)
+
+        def log_message(self, format, *args):
+            logger.debug(f"{self.address_string()} {format % args}")
+
+    return Handler
+
+
+def servir_atualizacoes(dias, fontes=None, porta=8000, intervalo_de_recarga=15):
+    cache = CacheDeAtualizacoes(dias, fontes, intervalo_de_recarga)
+    cache.recarregar()
+    threading.Thread(
+        target=cache.recarregar_periodicamente, name="recarga", daemon=True
+    ).start()
+
+    servidor = ThreadingHTTPServer(("127.0.0.1", porta), criar_handler(cache))
+    logger.info(f"servindo atualizações em http://127.0.0.1:{porta}/atualizacoes")
+    servidor.serve_forever()
+
+
 def postar_automatico():
     hoje = pendulum.today()
-    postar_atualizacoes(buscar_atualizacoes(hoje, hoje))
+    atualizacoes = list(buscar_atualizacoes(hoje, hoje))
+    # só o cron registra no feed, assim comandos manuais (e.g., listar de dias
+    # passados) não aparecem como novidade para os consumidores
+    registrar_no_feed(atualizacoes)
+    postar_atualizacoes(atualizacoes)
+
+
+def inteiro_positivo(valor):
+    numero = int(valor)
+    if numero < 1:
+        raise argparse.ArgumentTypeError(f"deve ser pelo menos 1: {valor}")
+    return numero
+
+
+def intervalo_de_dias(dias):
+    if dias:
+        dias = dias.split(":")
+        if len(dias) == 1:
+            return pendulum.parse(dias[0]), pendulum.today()
+        else:
+            return pendulum.parse(dias[0]), pendulum.parse(dias[1])
+    else:
+        return pendulum.today(), pendulum.today()
+
+
+def executar_comando(args):
+    if args.comando == "cron":
+        schedule.every(4).hours.do(postar_automatico)
+
+        while True:
+            schedule.run_pending()
+            time.sleep(1)
+
+    if args.comando == "feed":
+        imprimir_feed(args.desde, seguir=args.seguir)
+        return
+
+    if args.comando == "servir":
+        servir_atualizacoes(
+            args.dias,
+            fontes=args.fontes,
+            porta=args.porta,
+            intervalo_de_recarga=args.intervalo_de_recarga,
+        )
+        return
+
+    dias = intervalo_de_dias(args.dias)
+
+    if args.comando == "reconciliar":
+        relatorio = reconciliar_atualizacoes(dias[0], dias[1])
+        if args.corrigir_flairs:
+            relatorio["falhas_ao_corrigir_flairs"] = corrigir_flairs(relatorio)
+        print(json.dumps(relatorio, ensure_ascii=False, indent=2, default=str))
+        return
+
+    atualizacoes = buscar_atualizacoes_com_snapshot(
+        dias[0], dias[1], fontes=args.fontes, validade=args.validade_do_snapshot
+    )
+    if args.somente_flagged:
+        atualizacoes = [a for a in atualizacoes if a.flagged == args.somente_flagged]
+
+    if args.comando == "listar":
+        imprimir_atualizacoes(atualizacoes)
+
+    elif args.comando == "postar":
+        postar_atualizacoes(atualizacoes)
+
+    elif args.comando == "deletar":
+        deletar_atualizacoes(atualizacoes)
 
 
 if __name__ == "__main__":
@@ -754,7 +1755,17 @@ if __name__ == "__main__":
     )
 
     parser.add_argument(
-        "comando", choices=["listar", "postar", "deletar", "cron"], help=COMANDO_HELP
+        "comando",
+        choices=[
+            "listar",
+            "postar",
+            "deletar",
+            "cron",
+            "reconciliar",
+            "servir",
+            "feed",
+        ],
+        help=COMANDO_HELP,
     )
 
     parser.add_argument("--dias", "-d", help=DIAS_HELP)
@@ -774,7 +1785,44 @@ if __name__ == "__main__":
         action="store_true",
     )
 
+    parser.add_argument(
+        "--corrigir-flairs",
+        help=CORRIGIR_FLAIRS_HELP,
+        action="store_true",
+    )
+
+    parser.add_argument(
+        "--validade-do-snapshot",
+        metavar="MINUTOS",
+        type=int,
+        default=60,
+        help=VALIDADE_DO_SNAPSHOT_HELP,
+    )
+
+    parser.add_argument("--porta", type=int, default=8000, help=PORTA_HELP)
+
+    parser.add_argument(
+        "--intervalo-de-recarga",
+        metavar="MINUTOS",
+        type=inteiro_positivo,
+        default=15,
+        help=INTERVALO_DE_RECARGA_HELP,
+    )
+
+    parser.add_argument(
+        "--desde", metavar="POSICAO", type=int, default=0, help=DESDE_HELP
+    )
+
+    parser.add_argument("--seguir", help=SEGUIR_HELP, action="store_true")
+
+    parser.add_argument("--profile", metavar="ARQUIVO", help=PROFILE_HELP)
+
+    parser.add_argument("--cprofile", metavar="ARQUIVO", help=CPROFILE_HELP)
+
     args = parser.parse_args()
+    # os spans se acumulariam em memória e só seriam gravados ao interromper
+    if args.comando in ["cron", "servir"] and (args.profile or args.cprofile):
+        parser.error(f"--profile e --cprofile não podem ser usados com {args.comando}")
     logger.setLevel(
         {
             "debug": logging.DEBUG,
@@ -786,32 +1834,21 @@ if __name__ == "__main__":
     )
     logger.debug(f"argumentos: {args}")
 
-    if args.comando == "cron":
-        schedule.every(4).hours.do(postar_automatico)
+    if args.profile:
+        rastreador = Rastreador()
 
-        while True:
-            schedule.run_pending()
-            time.sleep(1)
+    perfilador = None
+    if args.cprofile:
+        perfilador = cProfile.Profile()
+        perfilador.enable()
 
-    dias = args.dias
-    if dias:
-        dias = dias.split(":")
-        if len(dias) == 1:
-            dias = [pendulum.parse(dias[0]), pendulum.today()]
-        else:
-            dias = [pendulum.parse(dias[0]), pendulum.parse(dias[1])]
-    else:
-        dias = [pendulum.today(), pendulum.today()]
-
-    atualizacoes = buscar_atualizacoes(dias[0], dias[1], fontes=args.fontes)
-    if args.somente_flagged:
-        atualizacoes = [a for a in atualizacoes if a.flagged == args.somente_flagged]
-
-    if args.comando == "listar":
-        imprimir_atualizacoes(atualizacoes)
-
-    elif args.comando == "postar":
-        postar_atualizacoes(atualizacoes)
-
-    elif args.comando == "deletar":
-        deletar_atualizacoes(atualizacoes)
+    try:
+        with span(f"comando {args.comando}", "comando"):
+            executar_comando(args)
+    finally:
+        if perfilador:
+            perfilador.disable()
+            perfilador.dump_stats(args.cprofile)
+            logger.info(f"dump do cProfile salvo em {args.cprofile}")
+        if rastreador:
+            rastreador.salvar(args.profile)